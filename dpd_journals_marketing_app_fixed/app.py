@@ -2,46 +2,153 @@
 # Save as app.py and run with: uvicorn app:app --reload --port 8000
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from collections import Counter, deque
+from html import escape as html_escape
+from string import Template
+from xml.sax.saxutils import escape as xml_escape
+import asyncio
+import gzip
+import logging
 import sqlite3
 import os
+import queue
+import threading
+import time
 import uuid
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from contextlib import asynccontextmanager
+from apscheduler.triggers.date import DateTrigger
+from contextlib import asynccontextmanager, contextmanager
 
 APP_TITLE = "DPD Journals – Digital Marketing Solution"
 DB_PATH = os.environ.get("DPD_DB", "dpd_marketing.sqlite3")
 
+logger = logging.getLogger(__name__)
+
 # ---- DB helpers ----
+# Per-connection pragmas: NORMAL sync is safe under WAL (one fsync per
+# checkpoint instead of per commit), the rest trade a little memory for
+# fewer syscalls on the hot /track path.
+_CONN_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+"""
+
 def get_db():
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.executescript(_CONN_PRAGMAS)
     return conn
 
+class ConnectionPool:
+    """One long-lived writer plus a few read-only connections.
+
+    SQLite allows a single writer at a time, so all writes funnel through
+    one connection guarded by a lock; under WAL the read-only connections
+    run concurrently with it. Opening connections once at startup avoids
+    the per-request connect/parse-schema cost of the old get_db() calls.
+    """
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self._writer = self._connect()
+        self._writer_lock = threading.Lock()
+        self._readers: queue.Queue = queue.Queue(maxsize=readers)
+        for _ in range(readers):
+            self._readers.put(self._connect(read_only=True))
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, cached_statements=256)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(_CONN_PRAGMAS)
+        return conn
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a read-only connection (blocks if all are in use)."""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        """Borrow the single read/write connection."""
+        with self._writer_lock:
+            yield self._writer
+
+    def close(self):
+        with self._writer_lock:
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+# Created in lifespan() once the schema exists; also exposed as app.state.pool.
+pool: Optional[ConnectionPool] = None
+
+_METRICS_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS metrics (
+        ts TEXT NOT NULL,
+        source TEXT,
+        medium TEXT,
+        campaign TEXT,
+        content TEXT,
+        term TEXT,
+        ip TEXT,
+        ua_id INTEGER,
+        referrer TEXT
+    )
+"""
+
+def _migrate_metrics(cur: sqlite3.Cursor):
+    """Rebuild a pre-ua_id metrics table in place.
+
+    CREATE TABLE IF NOT EXISTS never alters an existing table, so databases
+    created before the ua_id change still carry the old user_agent TEXT
+    column (and possibly the old id column). Rebuild once: intern the
+    distinct user agents, copy rows across with the resolved ids, and drop
+    the legacy table.
+    """
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(metrics)")}
+    if "ua_id" in cols:
+        return
+    cur.execute("ALTER TABLE metrics RENAME TO metrics_legacy")
+    cur.execute(_METRICS_SCHEMA_SQL)
+    cur.execute("INSERT OR IGNORE INTO user_agents (ua) SELECT DISTINCT user_agent FROM metrics_legacy WHERE user_agent IS NOT NULL")
+    cur.execute("""
+        INSERT INTO metrics (ts, source, medium, campaign, content, term, ip, ua_id, referrer)
+        SELECT m.ts, m.source, m.medium, m.campaign, m.content, m.term, m.ip, u.id, m.referrer
+        FROM metrics_legacy m LEFT JOIN user_agents u ON u.ua = m.user_agent
+    """)
+    cur.execute("DROP TABLE metrics_legacy")
+
 def init_db():
     conn = get_db()
     cur = conn.cursor()
-    cur.execute(\"\"\"
-        CREATE TABLE IF NOT EXISTS metrics (
-            id TEXT PRIMARY KEY,
-            ts TEXT NOT NULL,
-            source TEXT,
-            medium TEXT,
-            campaign TEXT,
-            content TEXT,
-            term TEXT,
-            ip TEXT,
-            user_agent TEXT,
-            referrer TEXT
+    # WAL is persistent for the DB file, so set it once here rather than on
+    # every connection; it lets /track writes proceed while readers poll.
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(_METRICS_SCHEMA_SQL)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_agents (
+            id INTEGER PRIMARY KEY,
+            ua TEXT UNIQUE
         )
-    \"\"\")
-    cur.execute(\"\"\"
+    """)
+    _migrate_metrics(cur)
+    cur.execute("""
         CREATE TABLE IF NOT EXISTS social_posts (
             id TEXT PRIMARY KEY,
             channel TEXT NOT NULL,
@@ -50,8 +157,8 @@ def init_db():
             status TEXT NOT NULL,
             sent_at TEXT
         )
-    \"\"\")
-    cur.execute(\"\"\"
+    """)
+    cur.execute("""
         CREATE TABLE IF NOT EXISTS email_campaigns (
             id TEXT PRIMARY KEY,
             subject TEXT NOT NULL,
@@ -61,8 +168,8 @@ def init_db():
             status TEXT NOT NULL,
             sent_at TEXT
         )
-    \"\"\")
-    cur.execute(\"\"\"
+    """)
+    cur.execute("""
         CREATE TABLE IF NOT EXISTS blog_posts (
             id TEXT PRIMARY KEY,
             slug TEXT UNIQUE NOT NULL,
@@ -71,55 +178,171 @@ def init_db():
             created_at TEXT NOT NULL,
             updated_at TEXT NOT NULL
         )
-    \"\"\")
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS metrics_daily (
+            date TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # The rollup starts empty on upgraded databases: seed it from the raw
+    # rows once so historic dashboard counts don't vanish after an upgrade.
+    if not cur.execute("SELECT EXISTS(SELECT 1 FROM metrics_daily)").fetchone()[0]:
+        cur.execute("""
+            INSERT INTO metrics_daily (date, count)
+            SELECT substr(ts, 1, 10), COUNT(*) FROM metrics GROUP BY substr(ts, 1, 10)
+        """)
+    # Partial indexes cover the scheduler's due-item scans (only pending rows
+    # are indexed, sent rows drop out); the rest serve the summary and feeds.
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_social_due ON social_posts(scheduled_at) WHERE status='scheduled'")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_email_due ON email_campaigns(scheduled_at) WHERE status='scheduled'")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_metrics_ts ON metrics(ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_blog_updated ON blog_posts(updated_at DESC)")
     conn.commit()
     conn.close()
 
-# ---- Background job ----
-def process_due_items():
-    conn = get_db()
-    cur = conn.cursor()
-    now = datetime.utcnow()
+# ---- SQL statements ----
+# Built once so the pooled connections' statement caches stay warm instead
+# of re-parsing the same SQL on every call. Timestamps are compared as raw
+# ISO-8601 strings — lexicographic order matches chronological order, so
+# there is no need to wrap each row in datetime().
+# Only the columns the metric rows need, with the 100-char truncation done
+# by substr() in SQLite — no full-row serialization for due-item scans.
+SELECT_DUE_SOCIAL_SQL = "SELECT channel, substr(content, 1, 100) AS content FROM social_posts WHERE status='scheduled' AND scheduled_at <= ?"
+SELECT_DUE_EMAIL_SQL = "SELECT substr(subject, 1, 100) AS subject FROM email_campaigns WHERE status='scheduled' AND scheduled_at <= ?"
+UPDATE_SOCIAL_SENT_SQL = "UPDATE social_posts SET status='sent', sent_at=? WHERE status='scheduled' AND scheduled_at <= ?"
+UPDATE_EMAIL_SENT_SQL = "UPDATE email_campaigns SET status='sent', sent_at=? WHERE status='scheduled' AND scheduled_at <= ?"
+INSERT_METRIC_SQL = """
+    INSERT INTO metrics (ts, source, medium, campaign, content, term, ip, ua_id, referrer)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_UA_SQL = "INSERT OR IGNORE INTO user_agents (ua) VALUES (?)"
+INSERT_SCHEDULED_METRIC_SQL = "INSERT INTO metrics (ts, source, medium, campaign, content) VALUES (?, ?, ?, ?, ?)"
+INSERT_SOCIAL_SQL = "INSERT INTO social_posts (id, channel, content, scheduled_at, status) VALUES (?, ?, ?, ?, 'scheduled')"
+INSERT_EMAIL_SQL = "INSERT INTO email_campaigns (id, subject, body, to_list, scheduled_at, status) VALUES (?, ?, ?, ?, ?, 'scheduled')"
+INSERT_BLOG_SQL = "INSERT INTO blog_posts (id, slug, title, body, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+UPSERT_METRICS_DAILY_SQL = "INSERT INTO metrics_daily (date, count) VALUES (?, ?) ON CONFLICT(date) DO UPDATE SET count = count + excluded.count"
+SELECT_METRICS_DAILY_SQL = "SELECT date, count FROM metrics_daily WHERE date >= ?"
+SELECT_NEXT_DUE_SQL = """
+    SELECT MIN(scheduled_at) AS next_due FROM (
+        SELECT scheduled_at FROM social_posts WHERE status='scheduled'
+        UNION ALL
+        SELECT scheduled_at FROM email_campaigns WHERE status='scheduled'
+    )
+"""
 
-    # Social posts
-    cur.execute(\"SELECT * FROM social_posts WHERE status='scheduled' AND datetime(scheduled_at) <= datetime(?)\", (now.isoformat(),))
-    for row in cur.fetchall():
-        cur.execute(\"UPDATE social_posts SET status='sent', sent_at=? WHERE id=?\", (now.isoformat(), row[0]))
-        # row: (id, channel, content, scheduled_at, status, sent_at)
-        add_metric(conn, ts=now.isoformat(), source=row[1], medium=\"social\", campaign=\"scheduled_social\", content=row[2][:100])
+# ---- Background job ----
+# The scheduler wakes for the next scheduled_at rather than polling every
+# 30 s: one-shot DateTrigger re-armed after each run and after every new
+# schedule call, with a long fallback wake when nothing is pending.
+scheduler: Optional[BackgroundScheduler] = None
+IDLE_WAKE_SECONDS = 300
+
+def schedule_next_run():
+    with pool.acquire() as conn:
+        next_due = conn.execute(SELECT_NEXT_DUE_SQL).fetchone()["next_due"]
+    now = datetime.now(timezone.utc)
+    if next_due:
+        run_at = datetime.fromisoformat(next_due)
+        if run_at.tzinfo is None:
+            run_at = run_at.replace(tzinfo=timezone.utc)
+        run_at = max(run_at, now)
+    else:
+        run_at = now + timedelta(seconds=IDLE_WAKE_SECONDS)
+    # misfire_grace_time=None: a wake that fires late (busy executor,
+    # suspended VM) must still run — a discarded misfire would mean nothing
+    # ever re-arms the one-shot job and due-item processing stalls.
+    scheduler.add_job(process_due_items, DateTrigger(run_date=run_at), id="process_due_items",
+                      replace_existing=True, misfire_grace_time=None)
 
-    # Emails
-    cur.execute(\"SELECT * FROM email_campaigns WHERE status='scheduled' AND datetime(scheduled_at) <= datetime(?)\", (now.isoformat(),))
-    for row in cur.fetchall():
-        cur.execute(\"UPDATE email_campaigns SET status='sent', sent_at=? WHERE id=?\", (now.isoformat(), row[0]))
-        add_metric(conn, ts=now.isoformat(), source=\"email\", medium=\"email\", campaign=\"scheduled_email\", content=row[1][:100])
+def process_due_items():
+    try:
+        _process_due_items()
+    finally:
+        schedule_next_run()
 
-    conn.commit()
-    conn.close()
+def _process_due_items():
+    now = datetime.utcnow().isoformat()
+    with pool.write() as conn:
+        cur = conn.cursor()
+
+        # Collect everything due, then flip status with one UPDATE per table
+        # and insert the matching metrics with a single executemany — one
+        # commit (one fsync) per tick no matter how many items came due.
+        cur.execute(SELECT_DUE_SOCIAL_SQL, (now,))
+        social_due = cur.fetchall()
+        cur.execute(SELECT_DUE_EMAIL_SQL, (now,))
+        email_due = cur.fetchall()
+        if not social_due and not email_due:
+            return
+
+        cur.execute(UPDATE_SOCIAL_SENT_SQL, (now, now))
+        cur.execute(UPDATE_EMAIL_SENT_SQL, (now, now))
+
+        metric_rows = [
+            (now, row["channel"], "social", "scheduled_social", row["content"])
+            for row in social_due
+        ] + [
+            (now, "email", "email", "scheduled_email", row["subject"])
+            for row in email_due
+        ]
+        cur.executemany(INSERT_SCHEDULED_METRIC_SQL, metric_rows)
+        cur.execute(UPSERT_METRICS_DAILY_SQL, (now[:10], len(metric_rows)))
+        conn.commit()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Initialize DB
+    global pool, scheduler
+
+    # Initialize DB, then open the shared pool against the ready schema
     init_db()
+    pool = ConnectionPool(DB_PATH)
+    app.state.pool = pool
 
     # Start scheduler safely (and ensure clean shutdown)
     scheduler = BackgroundScheduler()
-    scheduler.add_job(process_due_items, IntervalTrigger(seconds=30), id=\"process_due_items\", replace_existing=True)
     scheduler.start()
+    schedule_next_run()
+
+    app.state.metric_buffer = metric_buffer
+    flusher = asyncio.create_task(_metric_flusher())
 
     app.state.scheduler = scheduler
     try:
         yield
     finally:
         scheduler.shutdown(wait=False)
-
-app = FastAPI(title=APP_TITLE, lifespan=lifespan)
+        flusher.cancel()
+        flush_metrics()  # don't lose buffered rows on shutdown
+        pool.close()
+
+class ScopedCORSMiddleware:
+    """Run CORS handling only for paths under `prefix`.
+
+    Only the /api routes are fetched cross-origin; the tracking pixel,
+    blog pages and feeds are plain GETs, so they bypass Starlette's
+    per-request origin/header work entirely.
+    """
+    def __init__(self, app, prefix: str = "/api", **cors_options):
+        self.app = app
+        self.prefix = prefix
+        self.cors = CORSMiddleware(app, **cors_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.prefix):
+            await self.cors(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+# orjson serializes straight to bytes, several times faster than the stdlib
+# encoder — it matters for the summary payload every dashboard poll returns.
+app = FastAPI(title=APP_TITLE, lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[\"*\"],
+    ScopedCORSMiddleware,
+    allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=[\"*\"],
-    allow_headers=[\"*\"],
+    allow_methods=["*"],
+    allow_headers=["*"],
 )
 
 # ---- Schemas ----
@@ -143,37 +366,78 @@ class BlogInput(BaseModel):
 def now_iso() -> str:
     return datetime.utcnow().isoformat()
 
-def add_metric(conn: sqlite3.Connection, **kwargs):
-    cur = conn.cursor()
-    cur.execute(\"\"\"
-        INSERT INTO metrics (id, ts, source, medium, campaign, content, term, ip, user_agent, referrer)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    \"\"\", (
-        str(uuid.uuid4()),
-        kwargs.get(\"ts\", now_iso()),
-        kwargs.get(\"source\"),
-        kwargs.get(\"medium\"),
-        kwargs.get(\"campaign\"),
-        kwargs.get(\"content\"),
-        kwargs.get(\"term\"),
-        kwargs.get(\"ip\"),
-        kwargs.get(\"user_agent\"),
-        kwargs.get(\"referrer\"),
+# Metric rows are buffered here and flushed in batches so /track never pays
+# for a commit; deque append/popleft are atomic so no extra lock is needed.
+metric_buffer: deque = deque()
+METRIC_FLUSH_SECONDS = 0.1
+
+def enqueue_metric(**kwargs):
+    # No explicit id: metric rows are never addressed individually, so
+    # SQLite's implicit rowid replaces a 36-byte UUID per row.
+    metric_buffer.append((
+        kwargs.get("ts", now_iso()),
+        kwargs.get("source"),
+        kwargs.get("medium"),
+        kwargs.get("campaign"),
+        kwargs.get("content"),
+        kwargs.get("term"),
+        kwargs.get("ip"),
+        kwargs.get("user_agent"),
+        kwargs.get("referrer"),
     ))
-    conn.commit()
+
+def flush_metrics():
+    """Drain the buffer into metrics with one executemany and one commit."""
+    if not metric_buffer:
+        return
+    rows = []
+    while True:
+        try:
+            rows.append(metric_buffer.popleft())
+        except IndexError:
+            break
+    try:
+        daily = Counter(row[0][:10] for row in rows)
+        # Intern user-agent strings (often 200+ bytes, tiny cardinality) once
+        # per batch and store only the integer id on each metric row.
+        uas = {row[7] for row in rows if row[7]}
+        with pool.write() as conn:
+            ua_ids = {}
+            if uas:
+                conn.executemany(INSERT_UA_SQL, [(ua,) for ua in uas])
+                placeholders = ",".join("?" * len(uas))
+                for r in conn.execute(f"SELECT id, ua FROM user_agents WHERE ua IN ({placeholders})", list(uas)):
+                    ua_ids[r["ua"]] = r["id"]
+            conn.executemany(INSERT_METRIC_SQL, [row[:7] + (ua_ids.get(row[7]),) + row[8:] for row in rows])
+            conn.executemany(UPSERT_METRICS_DAILY_SQL, list(daily.items()))
+            conn.commit()
+    except Exception:
+        # Put the batch back (in order, ahead of newer rows) so a transient
+        # failure — lock contention, disk full — doesn't lose it.
+        metric_buffer.extendleft(reversed(rows))
+        raise
+
+async def _metric_flusher():
+    while True:
+        await asyncio.sleep(METRIC_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush_metrics)
+        except Exception:
+            # Keep the loop alive: the requeued batch is retried next pass.
+            logger.exception("metric flush failed; will retry")
 
 # ---- Dashboard HTML ----
-DASHBOARD_HTML = \"\"\"\
+DASHBOARD_HTML = """\
 <!doctype html>
 <html>
 <head>
-  <meta charset=\\"utf-8\\" />
-  <meta name=\\"viewport\\" content=\\"width=device-width, initial-scale=1\\" />
+  <meta charset=\"utf-8\" />
+  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
   <title>DPD Journals – Marketing Dashboard</title>
-  <meta name=\\"description\\" content=\\"Realtime marketing dashboard: campaigns, posts, and traffic.\\" />
-  <link rel=\\"preconnect\\" href=\\"https://fonts.googleapis.com\\">
-  <link rel=\\"preconnect\\" href=\\"https://fonts.gstatic.com\\" crossorigin>
-  <link href=\\"https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap\\" rel=\\"stylesheet\\">
+  <meta name=\"description\" content=\"Realtime marketing dashboard: campaigns, posts, and traffic.\" />
+  <link rel=\"preconnect\" href=\"https://fonts.googleapis.com\">
+  <link rel=\"preconnect\" href=\"https://fonts.gstatic.com\" crossorigin>
+  <link href=\"https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap\" rel=\"stylesheet\">
   <style>
     body{font-family:Inter,system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial,sans-serif;margin:0;background:#0b1020;color:#e8ebff}
     header{padding:24px 24px 8px;border-bottom:1px solid #1b2340;background:#0e1530;position:sticky;top:0}
@@ -196,24 +460,24 @@ DASHBOARD_HTML = \"\"\"\
 <body>
   <header>
     <h1>DPD Journals – Realtime Digital Marketing Dashboard</h1>
-    <div class=\\"muted\\">Auto-refresh metrics every 10s • Use forms below to add content & schedule campaigns</div>
+    <div class=\"muted\">Auto-refresh metrics every 10s • Use forms below to add content & schedule campaigns</div>
   </header>
-  <div class=\\"wrap\\">
+  <div class=\"wrap\">
 
-    <div class=\\"grid\\">
-      <div class=\\"card\\" style=\\"grid-column:span 12\\">
+    <div class=\"grid\">
+      <div class=\"card\" style=\"grid-column:span 12\">
         <h2>Traffic (last 14 days)</h2>
-        <canvas id=\\"trafficChart\\" height=\\"110\\"></canvas>
+        <canvas id=\"trafficChart\" height=\"110\"></canvas>
       </div>
     </div>
 
-    <div class=\\"two\\">
-      <div class=\\"card\\">
+    <div class=\"two\">
+      <div class=\"card\">
         <h2>Schedule Social Post</h2>
-        <div class=\\"row\\">
+        <div class=\"row\">
           <div>
             <label>Channel</label>
-            <select id=\\"social_channel\\">
+            <select id=\"social_channel\">
               <option>X</option>
               <option>LinkedIn</option>
               <option>Facebook</option>
@@ -222,78 +486,78 @@ DASHBOARD_HTML = \"\"\"\
           </div>
           <div>
             <label>When</label>
-            <input type=\\"datetime-local\\" id=\\"social_time\\" />
+            <input type=\"datetime-local\" id=\"social_time\" />
           </div>
         </div>
-        <div style=\\"margin-top:8px\\">
+        <div style=\"margin-top:8px\">
           <label>Content</label>
-          <textarea id=\\"social_content\\" rows=\\"3\\" placeholder=\\"Write your post... include your UTM link like https://your.site/track?utm_source=linkedin&utm_medium=social&utm_campaign=AugLaunch\\"></textarea>
+          <textarea id=\"social_content\" rows=\"3\" placeholder=\"Write your post... include your UTM link like https://your.site/track?utm_source=linkedin&utm_medium=social&utm_campaign=AugLaunch\"></textarea>
         </div>
-        <div style=\\"margin-top:12px\\">
-          <button onclick=\\"scheduleSocial()\\">Schedule</button>
-          <span id=\\"social_msg\\" class=\\"muted\\"></span>
+        <div style=\"margin-top:12px\">
+          <button onclick=\"scheduleSocial()\">Schedule</button>
+          <span id=\"social_msg\" class=\"muted\"></span>
         </div>
       </div>
 
-      <div class=\\"card\\">
+      <div class=\"card\">
         <h2>Schedule Email</h2>
-        <div class=\\"row\\">
+        <div class=\"row\">
           <div>
             <label>Subject</label>
-            <input id=\\"email_subject\\" placeholder=\\"Subject\\" />
+            <input id=\"email_subject\" placeholder=\"Subject\" />
           </div>
           <div>
             <label>When</label>
-            <input type=\\"datetime-local\\" id=\\"email_time\\" />
+            <input type=\"datetime-local\" id=\"email_time\" />
           </div>
         </div>
-        <div style=\\"margin-top:8px\\">
+        <div style=\"margin-top:8px\">
           <label>To List (comma emails or list name)</label>
-          <input id=\\"email_list\\" placeholder=\\"subscribers@dpd, authors@dpd or user1@example.com,user2@example.com\\" />
+          <input id=\"email_list\" placeholder=\"subscribers@dpd, authors@dpd or user1@example.com,user2@example.com\" />
         </div>
-        <div style=\\"margin-top:8px\\">
+        <div style=\"margin-top:8px\">
           <label>Body (HTML allowed)</label>
-          <textarea id=\\"email_body\\" rows=\\"4\\" placeholder='e.g., Read our new issue → <a href=\"/blog/ai-in-healthcare?utm_source=newsletter&utm_medium=email&utm_campaign=AugIssue\">Open</a>'></textarea>
+          <textarea id=\"email_body\" rows=\"4\" placeholder='e.g., Read our new issue → <a href="/blog/ai-in-healthcare?utm_source=newsletter&utm_medium=email&utm_campaign=AugIssue">Open</a>'></textarea>
         </div>
-        <div style=\\"margin-top:12px\\">
-          <button onclick=\\"scheduleEmail()\\">Schedule</button>
-          <span id=\\"email_msg\\" class=\\"muted\\"></span>
+        <div style=\"margin-top:12px\">
+          <button onclick=\"scheduleEmail()\">Schedule</button>
+          <span id=\"email_msg\" class=\"muted\"></span>
         </div>
       </div>
     </div>
 
-    <div class=\\"card\\">
+    <div class=\"card\">
       <h2>Publish Blog Post (SEO)</h2>
-      <div class=\\"row\\">
+      <div class=\"row\">
         <div>
           <label>Slug</label>
-          <input id=\\"blog_slug\\" placeholder=\\"ai-in-healthcare\\" />
+          <input id=\"blog_slug\" placeholder=\"ai-in-healthcare\" />
         </div>
         <div>
           <label>Title</label>
-          <input id=\\"blog_title\\" placeholder=\\"AI in Healthcare: 2025 Outlook\\" />
+          <input id=\"blog_title\" placeholder=\"AI in Healthcare: 2025 Outlook\" />
         </div>
       </div>
-      <div style=\\"margin-top:8px\\">
+      <div style=\"margin-top:8px\">
         <label>Body (Markdown/HTML)</label>
-        <textarea id=\\"blog_body\\" rows=\\"6\\" placeholder=\\"Write your article...\\"></textarea>
+        <textarea id=\"blog_body\" rows=\"6\" placeholder=\"Write your article...\"></textarea>
       </div>
-      <div style=\\"margin-top:12px\\">
-        <button onclick=\\"publishBlog()\\">Publish</button>
-        <span id=\\"blog_msg\\" class=\\"muted\\"></span>
+      <div style=\"margin-top:12px\">
+        <button onclick=\"publishBlog()\">Publish</button>
+        <span id=\"blog_msg\" class=\"muted\"></span>
       </div>
-      <div class=\\"muted\\" style=\\"margin-top:8px\\">After publishing, your post appears at <code>/blog/&lt;slug&gt;</code> and is included in <code>/sitemap.xml</code> and <code>/rss.xml</code>.</div>
+      <div class=\"muted\" style=\"margin-top:8px\">After publishing, your post appears at <code>/blog/&lt;slug&gt;</code> and is included in <code>/sitemap.xml</code> and <code>/rss.xml</code>.</div>
     </div>
 
-    <div class=\\"card\\">
+    <div class=\"card\">
       <h2>Quick Tracking Pixel Link</h2>
-      <div class=\\"muted\\">Share a link like:
+      <div class=\"muted\">Share a link like:
         <code>/track?utm_source=linkedin&utm_medium=social&utm_campaign=AugLaunch</code>. Each hit writes a row into metrics.</div>
     </div>
 
   </div>
 
-  <script src=\\"https://cdn.jsdelivr.net/npm/chart.js\\"></script>
+  <script src=\"https://cdn.jsdelivr.net/npm/chart.js\"></script>
   <script>
     async function fetchSummary(days=14){
       const r = await fetch(`/api/metrics/summary?days=${days}`);
@@ -302,10 +566,8 @@ DASHBOARD_HTML = \"\"\"\
 
     let chart;
     async function drawChart(){
-      const data = await fetchSummary(14);
+      const {labels, counts} = await fetchSummary(14);
       const ctx = document.getElementById('trafficChart').getContext('2d');
-      const labels = data.map(d=>d.date);
-      const counts = data.map(d=>d.count);
       if(chart){ chart.destroy(); }
       chart = new Chart(ctx, { type: 'line', data: { labels, datasets: [{ label: 'Visits / Events', data: counts }] }, options: { responsive:true, scales:{ y:{ beginAtZero:true }}}});
     }
@@ -352,161 +614,284 @@ DASHBOARD_HTML = \"\"\"\
   </script>
 </body>
 </html>
-\"\"\"
+"""
+
+# The dashboard is a constant string: build both plain and gzipped
+# responses once at import and pick per request by Accept-Encoding.
+DASHBOARD_RESPONSE = Response(
+    content=DASHBOARD_HTML,
+    media_type="text/html; charset=utf-8",
+    headers={"Cache-Control": "public, max-age=300"},
+)
+DASHBOARD_GZ_RESPONSE = Response(
+    content=gzip.compress(DASHBOARD_HTML.encode()),
+    media_type="text/html; charset=utf-8",
+    headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding", "Cache-Control": "public, max-age=300"},
+)
 
 # ---- Routes ----
-@app.get(\"/\", response_class=HTMLResponse)
-@app.get(\"/dashboard\", response_class=HTMLResponse)
-def dashboard():
-    return HTMLResponse(content=DASHBOARD_HTML)
-
-@app.post(\"/api/blog\")
-def create_blog(post: BlogInput):
-    conn = get_db()
-    cur = conn.cursor()
+@app.get("/", response_class=HTMLResponse)
+@app.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return DASHBOARD_GZ_RESPONSE
+    return DASHBOARD_RESPONSE
+
+# DB-bound handlers are async and push their SQL into a worker thread via
+# asyncio.to_thread: the event loop keeps accepting connections while the
+# single SQLite writer (or a pooled reader) does its work.
+# Blog content changes rarely but crawlers poll the feeds constantly:
+# sitemap/RSS XML is cached until this counter moves.
+blog_version = 0
+
+def _insert_blog(post: BlogInput) -> bool:
+    global blog_version
     now = datetime.utcnow().isoformat()
-    try:
-        cur.execute(
-            \"INSERT INTO blog_posts (id, slug, title, body, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)\",
-            (str(uuid.uuid4()), post.slug, post.title, post.body, now, now)
-        )
+    with pool.write() as conn:
+        try:
+            conn.execute(INSERT_BLOG_SQL, (uuid.uuid4().hex, post.slug, post.title, post.body, now, now))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            return False
+    blog_version += 1
+    return True
+
+@app.post("/api/blog")
+async def create_blog(post: BlogInput):
+    if not await asyncio.to_thread(_insert_blog, post):
+        return {"ok": False, "message": "Slug already exists"}
+    return {"ok": True, "message": f"Published '{post.title}'"}
+
+def _insert_social(item: SocialSchedule):
+    with pool.write() as conn:
+        conn.execute(INSERT_SOCIAL_SQL, (uuid.uuid4().hex, item.channel, item.content, item.scheduled_at.isoformat()))
         conn.commit()
-    except sqlite3.IntegrityError:
-        return {\"ok\": False, \"message\": \"Slug already exists\"}
-    finally:
-        conn.close()
-    return {\"ok\": True, \"message\": f\"Published '{post.title}'\"}
-
-@app.post(\"/api/schedule/social\")
-def schedule_social(item: SocialSchedule):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        \"INSERT INTO social_posts (id, channel, content, scheduled_at, status) VALUES (?, ?, ?, ?, 'scheduled')\",
-        (str(uuid.uuid4()), item.channel, item.content, item.scheduled_at.isoformat())
-    )
-    conn.commit()
-    conn.close()
-    return {\"ok\": True, \"message\": f\"Scheduled {item.channel} post for {item.scheduled_at}\"}
+    schedule_next_run()  # the new post may be due sooner than the next wake
 
-@app.post(\"/api/schedule/email\")
-def schedule_email(item: EmailSchedule):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        \"INSERT INTO email_campaigns (id, subject, body, to_list, scheduled_at, status) VALUES (?, ?, ?, ?, ?, 'scheduled')\",
-        (str(uuid.uuid4()), item.subject, item.body, item.to_list, item.scheduled_at.isoformat())
-    )
-    conn.commit()
-    conn.close()
-    return {\"ok\": True, \"message\": f\"Scheduled email for {item.scheduled_at}\"}
+@app.post("/api/schedule/social")
+async def schedule_social(item: SocialSchedule):
+    await asyncio.to_thread(_insert_social, item)
+    return {"ok": True, "message": f"Scheduled {item.channel} post for {item.scheduled_at}"}
 
-@app.get(\"/api/metrics/summary\")
-def metrics_summary(days: int = 14):
-    conn = get_db()
-    cur = conn.cursor()
+def _insert_email(item: EmailSchedule):
+    with pool.write() as conn:
+        conn.execute(INSERT_EMAIL_SQL, (uuid.uuid4().hex, item.subject, item.body, item.to_list, item.scheduled_at.isoformat()))
+        conn.commit()
+    schedule_next_run()  # the new campaign may be due sooner than the next wake
+
+@app.post("/api/schedule/email")
+async def schedule_email(item: EmailSchedule):
+    await asyncio.to_thread(_insert_email, item)
+    return {"ok": True, "message": f"Scheduled email for {item.scheduled_at}"}
+
+# Every open dashboard tab polls the summary every 10 s; the chart is a
+# 14-day rollup, so a few seconds of staleness is invisible. Cache the
+# computed payload per `days` value — bounded, since `days` comes from the
+# query string and must not grow the cache without limit.
+SUMMARY_CACHE_TTL = 5.0
+SUMMARY_CACHE_MAX = 8
+SUMMARY_DAYS_MAX = 366
+_summary_cache: Dict[int, tuple] = {}  # days -> (expires_at, payload, etag)
+
+def _store_summary(days: int, entry: tuple):
+    if len(_summary_cache) >= SUMMARY_CACHE_MAX:
+        now = time.monotonic()
+        for k in [k for k, v in _summary_cache.items() if v[0] <= now]:
+            del _summary_cache[k]
+    if len(_summary_cache) >= SUMMARY_CACHE_MAX:
+        # Still full of live entries: drop the one expiring soonest.
+        del _summary_cache[min(_summary_cache, key=lambda k: _summary_cache[k][0])]
+    _summary_cache[days] = entry
+
+def _http_date(iso_ts: str) -> str:
+    """ISO-8601 timestamp (stored as UTC) -> RFC 7231 date for headers."""
+    dt = datetime.fromisoformat(iso_ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt, usegmt=True)
+
+def _build_summary(days: int):
     start = (datetime.utcnow() - timedelta(days=days-1)).date()
-    cur.execute(\"SELECT ts FROM metrics WHERE date(ts) >= date(?)\", (start.isoformat(),))
-    rows = cur.fetchall()
+    # Reads hit the pre-aggregated metrics_daily rollup (maintained by the
+    # metric flusher and the scheduler) — at most `days` primary-key rows,
+    # regardless of raw traffic volume. Merge into the zero-filled range.
+    with pool.acquire() as conn:
+        cur = conn.cursor()
+        cur.execute(SELECT_METRICS_DAILY_SQL, (start.isoformat(),))
+        rows = cur.fetchall()
+        cur.execute("SELECT max(ts) AS latest FROM metrics")
+        latest = cur.fetchone()["latest"] or ""
+    # Two parallel lists rather than a dict per day: one allocation each,
+    # half the JSON, and the chart consumes them without re-mapping.
     buckets: Dict[str, int] = { (start + timedelta(days=i)).isoformat(): 0 for i in range(days) }
     for r in rows:
-        d = r[\"ts\"][:10] if isinstance(r[\"ts\"], str) else str(r[\"ts\"])[:10]
-        if d in buckets:
-            buckets[d] += 1
-    conn.close()
-    return [{\"date\": k, \"count\": buckets[k]} for k in sorted(buckets.keys())]
-
-# 1x1 transparent GIF for tracking pixel
-GIF_BYTES = (b\"\\x47\\x49\\x46\\x38\\x39\\x61\\x01\\x00\\x01\\x00\\x80\\x00\\x00\\x00\\x00\\x00\\xff\\xff\\xff\\x21\\xf9\\x04\\x01\\x00\\x00\\x00\\x00\\x2c\\x00\\x00\\x00\\x00\\x01\\x00\\x01\\x00\\x00\\x02\\x02\\x44\\x01\\x00\\x3b\")
-
-@app.get(\"/track\")
-def track(request: Request,
-          utm_source: Optional[str] = None,
-          utm_medium: Optional[str] = None,
-          utm_campaign: Optional[str] = None,
-          utm_content: Optional[str] = None,
-          utm_term: Optional[str] = None):
-    conn = get_db()
-    add_metric(
-        conn,
+        if r["date"] in buckets:
+            buckets[r["date"]] = r["count"]
+    payload = {"labels": list(buckets), "counts": list(buckets.values())}
+    etag = f'W/"{days}-{latest}"'
+    entry = (time.monotonic() + SUMMARY_CACHE_TTL, payload, etag)
+    _store_summary(days, entry)
+    return entry
+
+@app.get("/api/metrics/summary")
+async def metrics_summary(request: Request, response: Response, days: int = 14):
+    days = max(1, min(days, SUMMARY_DAYS_MAX))
+    cached = _summary_cache.get(days)
+    if not (cached and cached[0] > time.monotonic()):
+        cached = await asyncio.to_thread(_build_summary, days)
+    _, payload, etag = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["Cache-Control"] = f"public, max-age={int(SUMMARY_CACHE_TTL)}"
+    response.headers["ETag"] = etag
+    return payload
+
+# 1x1 transparent GIF for tracking pixel — 43 constant bytes, so reuse one
+# prebuilt Response instead of constructing one per hit. The immutable
+# cache header lets clients stop re-fetching the pixel body entirely.
+GIF_BYTES = (b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff\x21\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x44\x01\x00\x3b")
+GIF_RESPONSE = Response(
+    content=GIF_BYTES,
+    media_type="image/gif",
+    headers={"Cache-Control": "public, max-age=31536000, immutable"},
+)
+
+@app.get("/track")
+async def track(request: Request,
+                utm_source: Optional[str] = None,
+                utm_medium: Optional[str] = None,
+                utm_campaign: Optional[str] = None,
+                utm_content: Optional[str] = None,
+                utm_term: Optional[str] = None):
+    # The client never needs the insert result: the enqueue is a lock-free
+    # deque append, so do it inline and let the background flusher handle
+    # the actual DB work. (BackgroundTasks can't be used here — FastAPI
+    # attaches them to the returned response, and tasks attached to the
+    # shared GIF_RESPONSE would replay on every later hit.)
+    enqueue_metric(
         source=utm_source,
         medium=utm_medium,
         campaign=utm_campaign,
         content=utm_content,
         term=utm_term,
         ip=(request.client.host if request.client else None),
-        user_agent=request.headers.get(\"user-agent\"),
-        referrer=request.headers.get(\"referer\") or request.headers.get(\"referrer\"),
+        user_agent=request.headers.get("user-agent"),
+        referrer=request.headers.get("referer") or request.headers.get("referrer"),
     )
-    conn.close()
-    return Response(content=GIF_BYTES, media_type=\"image/gif\")
+    return GIF_RESPONSE
 
 # robots + sitemap + rss
-@app.get(\"/robots.txt\", response_class=PlainTextResponse)
+@app.get("/robots.txt", response_class=PlainTextResponse)
 def robots():
-    return PlainTextResponse(\"\"\"
+    return PlainTextResponse("""
 User-agent: *
 Allow: /
 Sitemap: /sitemap.xml
-\"\"\".strip())
-
-@app.get(\"/sitemap.xml\")
-def sitemap():
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(\"SELECT slug, updated_at FROM blog_posts ORDER BY updated_at DESC\")
-    rows = cur.fetchall()
-    base = os.environ.get(\"SITE_BASE\", \"http://localhost:8000\")
+""".strip())
+
+def _fetch_all(sql: str, params: tuple = ()):
+    with pool.acquire() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+# Serialized XML cached against blog_version; rebuilt under a lock only
+# after a blog write, so crawler polls cost one string send.
+_feed_lock = threading.Lock()
+_sitemap_cache = {"v": -1, "body": ""}
+_rss_cache = {"v": -1, "body": ""}
+FEED_CACHE_HEADERS = {"Cache-Control": "public, max-age=300"}
+
+def _build_sitemap() -> str:
+    version = blog_version
+    rows = _fetch_all("SELECT slug, updated_at FROM blog_posts ORDER BY updated_at DESC")
+    base = os.environ.get("SITE_BASE", "http://localhost:8000")
     urls = []
     for r in rows:
-        urls.append(f\"<url><loc>{base}/blog/{r['slug']}</loc><lastmod>{r['updated_at']}</lastmod></url>\")
-    xml = \"<?xml version=\\\"1.0\\\" encoding=\\\"UTF-8\\\"?>\\n\" + \
-          \"<urlset xmlns=\\\"http://www.sitemaps.org/schemas/sitemap/0.9\\\">\" + \"\".join(urls) + \"</urlset>\"
-    conn.close()
-    return Response(content=xml, media_type=\"application/xml\")
-
-@app.get(\"/rss.xml\")
-def rss():
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(\"SELECT slug, title, body, updated_at FROM blog_posts ORDER BY updated_at DESC LIMIT 20\")
-    base = os.environ.get(\"SITE_BASE\", \"http://localhost:8000\")
+        urls.append(f"<url><loc>{xml_escape(base)}/blog/{xml_escape(r['slug'])}</loc><lastmod>{xml_escape(r['updated_at'])}</lastmod></url>")
+    xml = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n" + \
+          "<urlset xmlns=\"http://www.sitemaps.org/schemas/sitemap/0.9\">" + "".join(urls) + "</urlset>"
+    with _feed_lock:
+        _sitemap_cache.update(v=version, body=xml)
+    return xml
+
+def _build_rss() -> str:
+    version = blog_version
+    # substr() keeps large bodies inside SQLite — only the 400-char teaser
+    # crosses into Python.
+    rows = _fetch_all("SELECT slug, title, substr(body, 1, 400) AS body, updated_at FROM blog_posts ORDER BY updated_at DESC LIMIT 20")
+    base = os.environ.get("SITE_BASE", "http://localhost:8000")
     items = []
-    for r in cur.fetchall():
-        link = f\"{base}/blog/{r['slug']}\"
-        items.append(f\"<item><title>{r['title']}</title><link>{link}</link><description><![CDATA[{r['body'][:400]}...]]></description></item>\")
-    xml = (\"<?xml version=\\\"1.0\\\" encoding=\\\"UTF-8\\\"?>\"
-           \"<rss version=\\\"2.0\\\"><channel>\"
-           f\"<title>DPD Journals Feed</title><link>{base}</link><description>Latest content</description>\"
-           + \"\".join(items) + \"</channel></rss>\")
-    conn.close()
-    return Response(content=xml, media_type=\"application/rss+xml\")
-
-@app.get(\"/blog/{slug}\", response_class=HTMLResponse)
-def view_blog(slug: str):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(\"SELECT title, body, updated_at FROM blog_posts WHERE slug = ?\", (slug,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        return HTMLResponse(\"<h1>Not found</h1>\", status_code=404)
-    html = f\"\"\"
+    for r in rows:
+        link = xml_escape(f"{base}/blog/{r['slug']}")
+        # CDATA keeps the body verbatim; only a literal ]]> could break out
+        body = r['body'].replace("]]>", "]]&gt;")
+        items.append(f"<item><title>{xml_escape(r['title'])}</title><link>{link}</link><description><![CDATA[{body}...]]></description></item>")
+    xml = ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+           "<rss version=\"2.0\"><channel>"
+           f"<title>DPD Journals Feed</title><link>{base}</link><description>Latest content</description>"
+           + "".join(items) + "</channel></rss>")
+    with _feed_lock:
+        _rss_cache.update(v=version, body=xml)
+    return xml
+
+@app.get("/sitemap.xml")
+async def sitemap():
+    if _sitemap_cache["v"] == blog_version:
+        xml = _sitemap_cache["body"]
+    else:
+        xml = await asyncio.to_thread(_build_sitemap)
+    return Response(content=xml, media_type="application/xml", headers=FEED_CACHE_HEADERS)
+
+@app.get("/rss.xml")
+async def rss():
+    if _rss_cache["v"] == blog_version:
+        xml = _rss_cache["body"]
+    else:
+        xml = await asyncio.to_thread(_build_rss)
+    return Response(content=xml, media_type="application/rss+xml", headers=FEED_CACHE_HEADERS)
+
+def _fetch_blog(slug: str):
+    with pool.acquire() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT title, body, updated_at FROM blog_posts WHERE slug = ?", (slug,))
+        return cur.fetchone()
+
+# Compiled once at import; fields are escaped before substitution. The body
+# is intentionally left raw — authored HTML is part of the blog feature.
+BLOG_TEMPLATE = Template("""
     <!doctype html><html><head>
       <meta charset='utf-8'>
       <meta name='viewport' content='width=device-width, initial-scale=1'>
-      <title>{row['title']} – DPD Journals</title>
-      <meta name='description' content='{row['title'][:140]}'>
+      <title>$title – DPD Journals</title>
+      <meta name='description' content='$description'>
       <link rel='alternate' type='application/rss+xml' title='RSS' href='/rss.xml'>
-      <style>body{{font-family:Inter,system-ui;max-width:800px;margin:40px auto;padding:0 16px;line-height:1.6}} h1{{line-height:1.25}}</style>
+      <style>body{font-family:Inter,system-ui;max-width:800px;margin:40px auto;padding:0 16px;line-height:1.6} h1{line-height:1.25}</style>
     </head><body>
       <article>
-        <h1>{row['title']}</h1>
-        <div class='muted'>Updated {row['updated_at']}</div>
-        <div>{row['body']}</div>
+        <h1>$title</h1>
+        <div class='muted'>Updated $updated</div>
+        <div>$body</div>
       </article>
     </body></html>
-    \"\"\"
-    return HTMLResponse(html)
+    """)
+
+@app.get("/blog/{slug}", response_class=HTMLResponse)
+async def view_blog(request: Request, slug: str):
+    row = await asyncio.to_thread(_fetch_blog, slug)
+    if not row:
+        return HTMLResponse("<h1>Not found</h1>", status_code=404)
+    # updated_at changes whenever the post does, so it doubles as a weak
+    # validator: cache-warm repeat visits cost a 304, not the full page.
+    etag = f'W/"{row["updated_at"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    html = BLOG_TEMPLATE.substitute(
+        title=html_escape(row["title"]),
+        description=html_escape(row["title"][:140]),
+        updated=html_escape(row["updated_at"]),
+        body=row["body"],
+    )
+    return HTMLResponse(html, headers={"ETag": etag, "Last-Modified": _http_date(row["updated_at"])})
 
 # Run (dev): uvicorn app:app --reload --port 8000